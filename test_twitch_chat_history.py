@@ -0,0 +1,107 @@
+"""
+    test_twitch_chat_history.py: Tests for the recent Twitch chat buffer
+    Copyright (C) 2020  MountainRiderAK
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as
+    published by the Free Software Foundation, version 3 of the
+    License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import Counter
+import unittest
+
+from twitch_chat_history import TwitchChatHistory
+from twitch_chat_history import add_nick_to_token
+from twitch_chat_history import add_to_index
+from twitch_chat_history import remove_from_index
+from twitch_chat_history import remove_nick_from_token
+
+
+class TestTwitchChatHistory(unittest.TestCase):
+    def assert_indexes_match_entries(self, history):
+        # Rebuild both indexes from the live entries, oldest first
+        nick_index = dict()
+        token_counts = dict()
+        first = max(0, history.sequence - history.capacity)
+        for sequence in range(first, history.sequence):
+            nick, message, tokens, timestamp = history.entries[sequence % history.capacity]
+            nick_index.setdefault(nick, list()).append(sequence)
+            for token in tokens:
+                token_counts.setdefault(token, Counter())[nick] += 1
+        self.assertEqual({nick: list(entries) for nick, entries in history.nick_index.items()}, nick_index)
+        self.assertEqual({token: Counter(counts) for token, counts in history.token_index.items()}, token_counts)
+
+    def test_indexes_after_wrapping(self):
+        history = TwitchChatHistory(5)
+        messages = [
+            ("Alice", "hello hello world"),
+            ("alice", "spam spam https://spam.example"),
+            ("ALICE", "world"),
+            ("Bob", "hello"),
+            ("bob", "spam!"),
+            ("Carol", "(spam) and more spam"),
+            ("carol", "bye"),
+            ("Alice", "hello again"),
+            ("Dave", "https://spam.example"),
+        ]
+        for nick, message in messages:
+            history.add(nick, message)
+            self.assert_indexes_match_entries(history)
+        self.assertEqual(len(history), 5)
+        self.assertNotIn("Alice", history.nick_index)
+        self.assertNotIn("world", history.token_index)
+
+    def test_messages_from_ignores_case(self):
+        history = TwitchChatHistory(3)
+        history.add("Alice", "one", 1.0)
+        history.add("bob", "two", 2.0)
+        history.add("alice", "three", 3.0)
+        history.add("ALICE", "four", 4.0)
+        self.assertEqual(history.messages_from("aLiCe", 5), [(4.0, "four"), (3.0, "three")])
+        self.assertEqual(history.message_count("alice"), 2)
+        self.assertEqual(history.messages_from("bob", 5), [(2.0, "two")])
+        self.assertEqual(history.messages_from("nobody", 5), [])
+
+    def test_nicks_who_said_most_recent_first(self):
+        history = TwitchChatHistory(4)
+        history.add("alice", "spam")
+        history.add("bob", "spam")
+        history.add("carol", "spam spam")
+        history.add("bob", "Spam.")
+        self.assertEqual(history.nicks_who_said("SPAM", 5), ["bob", "carol", "alice"])
+        self.assertEqual(history.nicks_who_said("spam", 2), ["bob", "carol"])
+        history.add("dave", "hello")
+        self.assertEqual(history.nicks_who_said("spam", 5), ["bob", "carol"])
+        self.assertEqual(history.nicks_who_said("missing", 5), [])
+
+    def test_invalid_capacity(self):
+        for capacity in (0, -1, "10"):
+            with self.assertRaises(ValueError):
+                TwitchChatHistory(capacity)
+
+    def test_out_of_order_eviction_fails(self):
+        index = dict()
+        add_to_index(index, "alice", 1)
+        add_to_index(index, "alice", 2)
+        with self.assertRaises(RuntimeError):
+            remove_from_index(index, "alice", 2)
+        self.assertEqual(list(index["alice"]), [1, 2])
+
+    def test_evicting_missing_nick_fails(self):
+        index = dict()
+        add_nick_to_token(index, "spam", "alice")
+        with self.assertRaises(RuntimeError):
+            remove_nick_from_token(index, "spam", "bob")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+    test_twitch_chat_transport.py: Tests for the Twitch chat transports
+    Copyright (C) 2020  MountainRiderAK
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as
+    published by the Free Software Foundation, version 3 of the
+    License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import unittest
+
+from twitch_chat_transport import TcpTransport
+from twitch_chat_transport import WebsocketTransport
+from twitch_chat_transport import create_transport
+
+
+class TestTcpTransport(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # The server writes each chunk put in server_writes and closes the
+        # connection when it gets None
+        self.server_writes = asyncio.Queue()
+        self.server_received = asyncio.Queue()
+        self.server = await asyncio.start_server(self.handle_client, '127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.transport = TcpTransport('127.0.0.1', port, use_tls=False)
+        await self.transport.connect()
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server_writes.put(None)
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        read_task = asyncio.create_task(self.read_from_client(reader))
+        while True:
+            chunk = await self.server_writes.get()
+            if chunk is None:
+                break
+            writer.write(chunk)
+            await writer.drain()
+        writer.close()
+        read_task.cancel()
+
+    async def read_from_client(self, reader):
+        while True:
+            data = await reader.read(1024)
+            if not data:
+                break
+            await self.server_received.put(data)
+
+    async def test_line_split_across_reads(self):
+        await self.server_writes.put(b'PRIVMSG #channel :hel')
+        recv_task = asyncio.create_task(self.transport.recv_lines())
+        # Let the client read the first chunk on its own
+        await asyncio.sleep(0.05)
+        self.assertFalse(recv_task.done())
+        await self.server_writes.put(b'lo\r\n')
+        self.assertEqual(await asyncio.wait_for(recv_task, 1.0), ['PRIVMSG #channel :hello'])
+
+    async def test_several_lines_in_one_read(self):
+        await self.server_writes.put(b'PING :tmi.twitch.tv\r\nPRIVMSG #channel :one\r\nPRIVMSG #channel :two\r\nPART')
+        self.assertEqual(await asyncio.wait_for(self.transport.recv_lines(), 1.0),
+                         ['PING :tmi.twitch.tv', 'PRIVMSG #channel :one', 'PRIVMSG #channel :two'])
+        self.assertEqual(self.transport.receive_buffer, b'PART')
+
+    async def test_server_close_raises_connection_error(self):
+        await self.server_writes.put(b'PING :tmi.twitch.tv\r\n')
+        await self.server_writes.put(None)
+        self.assertEqual(await asyncio.wait_for(self.transport.recv_lines(), 1.0), ['PING :tmi.twitch.tv'])
+        with self.assertRaises(ConnectionError):
+            await asyncio.wait_for(self.transport.recv_lines(), 1.0)
+
+    async def test_send_lines_is_one_write(self):
+        writes = list()
+        write = self.transport.writer.write
+
+        def counting_write(data):
+            writes.append(data)
+            write(data)
+
+        self.transport.writer.write = counting_write
+        await self.transport.send_lines(['PASS oauth:token', 'NICK bot', 'JOIN #channel'])
+        self.assertEqual(writes, [b'PASS oauth:token\r\nNICK bot\r\nJOIN #channel\r\n'])
+        received = b''
+        while len(received) < len(writes[0]):
+            received += await asyncio.wait_for(self.server_received.get(), 1.0)
+        self.assertEqual(received, writes[0])
+
+    async def test_not_connected_raises_connection_error(self):
+        await self.transport.close()
+        with self.assertRaises(ConnectionError):
+            await self.transport.recv_lines()
+        with self.assertRaises(ConnectionError):
+            await self.transport.send_lines(['PING'])
+
+
+class StubWebsocket(object):
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    async def recv(self):
+        return self.frames.pop(0)
+
+
+class TestWebsocketTransport(unittest.IsolatedAsyncioTestCase):
+    async def test_recv_lines_buffers_partial_lines(self):
+        transport = WebsocketTransport()
+        transport.websocket = StubWebsocket([
+            'PRIVMSG #channel :hel',
+            'lo\r\nPING :tmi.twitch.tv\r\nPRIVMSG #channel :par',
+            'tial\r\n',
+        ])
+        self.assertEqual(await transport.recv_lines(), [])
+        self.assertEqual(await transport.recv_lines(), ['PRIVMSG #channel :hello', 'PING :tmi.twitch.tv'])
+        self.assertEqual(await transport.recv_lines(), ['PRIVMSG #channel :partial'])
+        self.assertEqual(transport.receive_buffer, '')
+
+    async def test_not_connected_raises_connection_error(self):
+        transport = WebsocketTransport()
+        with self.assertRaises(ConnectionError):
+            await transport.recv_lines()
+
+
+class TestCreateTransport(unittest.TestCase):
+    def test_known_transports(self):
+        self.assertIsInstance(create_transport('tcp'), TcpTransport)
+        self.assertIsInstance(create_transport('WebSocket'), WebsocketTransport)
+
+    def test_unknown_transport(self):
+        for name in ('tls', None, 3):
+            with self.assertRaises(ValueError):
+                create_transport(name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,9 +17,11 @@
 """
 
 import asyncio
-import websockets
+import time
 
 from configuration import add_configuration
+from twitch_chat_history import TwitchChatHistory
+from twitch_chat_transport import create_transport
 from twitch_follow_server import start_server_and_subscribe
 from twitch_privmsg import is_privmsg
 from twitch_privmsg import TwitchPrivmsg
@@ -27,26 +29,32 @@ import microsecond_logging
 
 
 class TwitchChatBot(object):
-    twitch_chat_websocket_uri = "wss://irc-ws.chat.twitch.tv:443"
-
     def __init__(self, logger):
         add_configuration(self)
         self.logger = logger
         self.loop = asyncio.get_event_loop()
-        self.websocket = None
+        if not hasattr(self, 'transport'):
+            self.transport = 'websocket'
+        self.chat_transport = create_transport(self.transport)
         self.new_follower = None
         self.send_caps = False
         self.cap_list = ['commands', 'tags', 'membership']
-        self.receive_buffer = ''
         self.backoff_interval = 2
         self.backoff_counter = 1
         self.success_counter = 0
         self.bot_message = "Hello! Welcome to the channel!"
         self.bot_message_interval = 5 * 60
         self.bot_message_counter = 0
+        if not hasattr(self, 'chat_history_size'):
+            self.chat_history_size = 10000
+        if not isinstance(self.chat_history_size, int) or self.chat_history_size < 1:
+            raise ValueError(f"CHAT_HISTORY_SIZE must be a positive integer, not {self.chat_history_size!r}")
+        self.chat_history = dict()
+        self.lookup_limit = 5
+        self.privmsg_max_length = 500
 
     async def send_data(self, data):
-        await self.websocket.send(f"{data}\r\n")
+        await self.chat_transport.send_lines([data])
 
     async def send_cap(self, cap):
         await self.send_data(f"CAP REQ :twitch.tv/{cap}")
@@ -56,37 +64,31 @@ class TwitchChatBot(object):
         await self.send_data(f"PRIVMSG #{channel} :{message}")
 
     async def connect(self):
-        self.websocket = await websockets.connect(self.twitch_chat_websocket_uri)
-        await self.send_data(f"PASS {self.tim_token}")
-        await self.send_data(f"NICK {self.bot_nick}")
-        if self.send_caps:
-            for cap in self.cap_list:
-                await self.send_cap(cap)
+        await self.chat_transport.connect()
         channel = self.channel.lower()
-        await self.send_data(f"JOIN #{channel}")
-        # Read from the websocket until there is no more data
-        result = ''
+        lines = [f"PASS {self.tim_token}", f"NICK {self.bot_nick}"]
+        if self.send_caps:
+            lines.extend(f"CAP REQ :twitch.tv/{cap}" for cap in self.cap_list)
+        lines.append(f"JOIN #{channel}")
+        await self.chat_transport.send_lines(lines)
+        # Read from the connection until there is no more data and print each line
         while True:
             try:
-                result = result + await asyncio.wait_for(self.websocket.recv(), 1.0)
+                line_list = await asyncio.wait_for(self.chat_transport.recv_lines(), 1.0)
             except asyncio.TimeoutError:
                 break
-        # Convert the data to a list of lines and print each line
-        line_list = result.split('\n')
-        for line in line_list:
-            self.logger.debug(line)
+            for line in line_list:
+                self.logger.debug(line)
 
     async def listen(self):
         try:
-            self.receive_buffer = self.receive_buffer + await asyncio.wait_for(self.websocket.recv(), 1.0)
-            if self.receive_buffer.endswith('\n'):
-                self.receive_buffer = self.receive_buffer.rstrip()
-                self.logger.debug(self.receive_buffer)
-                await self.handle_ping(self.receive_buffer)
-                await self.handle_privmsg(self.receive_buffer)
-                self.receive_buffer = ''
+            line_list = await asyncio.wait_for(self.chat_transport.recv_lines(), 1.0)
         except asyncio.TimeoutError:
-            pass
+            return
+        for line in line_list:
+            self.logger.debug(line)
+            await self.handle_ping(line)
+            await self.handle_privmsg(line)
 
     async def handle_ping(self, message):
         if message.startswith('PING'):
@@ -109,14 +111,73 @@ class TwitchChatBot(object):
     async def handle_privmsg(self, message):
         if is_privmsg(message):
             privmsg = TwitchPrivmsg(message)
+            # Record commands too since raid spam often starts with '!', but
+            # leave out the moderators' own lookups
+            if not self.is_lookup_command(privmsg.nick, privmsg.message):
+                self.record_privmsg(privmsg)
             if privmsg.message.startswith('!'):
                 await self.handle_command(privmsg.nick, privmsg.message[1:])
             else:
                 await self.handle_privmsg_post(privmsg)
                 self.logger.debug(f"Received \"{privmsg.message}\" from {privmsg.nick}")
 
+    def record_privmsg(self, privmsg):
+        channel = privmsg.channel.lower()
+        if channel not in self.chat_history:
+            self.chat_history[channel] = TwitchChatHistory(self.chat_history_size)
+        self.chat_history[channel].add(privmsg.nick, privmsg.message)
+
+    def is_moderator(self, nick):
+        nick = nick.lower()
+        moderators = [self.channel.lower(), self.bot_nick.lower()]
+        if hasattr(self, 'moderators'):
+            moderators.extend(moderator.lower() for moderator in self.moderators)
+        return nick in moderators
+
+    def is_lookup_command(self, nick, message):
+        words = message.split()
+        return len(words) == 2 and words[0] in ('!said', '!whosaid') and self.is_moderator(nick)
+
     async def handle_command(self, nick, command):
-        pass
+        if self.is_moderator(nick):
+            await self.handle_lookup_command(command)
+
+    async def handle_lookup_command(self, command):
+        words = command.split()
+        if len(words) != 2:
+            return
+        name, argument = words
+        chat_history = self.chat_history.get(f"#{self.channel.lower()}")
+        # Never repeat chat text in the channel, during a raid it is the spam and
+        # abuse the moderators are looking for. Reply with a summary and write
+        # the messages to the log.
+        if name == 'said':
+            nick = argument.lstrip('@').lower()
+            messages = list()
+            count = 0
+            if chat_history is not None:
+                messages = chat_history.messages_from(nick, self.lookup_limit)
+                count = chat_history.message_count(nick)
+            if messages:
+                for timestamp, message in messages:
+                    self.logger.info(f"!said {nick}: {time.strftime('%H:%M:%S', time.localtime(timestamp))} {message}")
+                last_seconds = int(time.time() - messages[0][0])
+                reply = f"{nick} sent {count} recent messages, the last one {last_seconds}s ago. " \
+                        f"The last {len(messages)} are in the bot log."
+            else:
+                reply = f"No recent messages from {nick}"
+        elif name == 'whosaid':
+            nicks = list()
+            if chat_history is not None:
+                nicks = chat_history.nicks_who_said(argument, self.lookup_limit)
+            self.logger.info(f"!whosaid {argument}: {', '.join(nicks)}")
+            if nicks:
+                reply = "Most recent senders of that text: " + ', '.join(nicks)
+            else:
+                reply = "No recent messages contain that text"
+        else:
+            return
+        await self.send_privmsg(reply[:self.privmsg_max_length])
 
     async def send_periodic_message(self):
         await asyncio.sleep(1.0)
@@ -129,8 +190,8 @@ class TwitchChatBot(object):
     async def run_tasks(self):
         await self.connect()
         while True:
+            task_list = list()
             try:
-                task_list = list()
                 task_list.append(asyncio.create_task(self.listen()))
                 task_list.append(asyncio.create_task(self.handle_new_follower()))
                 task_list.append(asyncio.create_task(self.send_periodic_message()))
@@ -139,8 +200,13 @@ class TwitchChatBot(object):
                 if self.success_counter > self.backoff_counter:
                     self.success_counter = 1
                     self.backoff_counter = 1
-            except websockets.ConnectionClosed:
+            except ConnectionError:
                 self.logger.error("Connection was closed. Reconnecting...")
+                # Stop the other tasks before the connection they use goes away
+                for task in task_list:
+                    task.cancel()
+                await asyncio.gather(*task_list, return_exceptions=True)
+                await self.chat_transport.close()
                 self.backoff_interval = self.backoff_interval ** self.backoff_counter
                 self.backoff_counter += 1
                 await asyncio.sleep(self.backoff_interval)
@@ -62,6 +62,7 @@ class TwitchChatBotTTS(TwitchChatBot):
         self.logger.debug(f"Received \"{privmsg.message}\" from {privmsg.nick}")
 
     async def handle_command(self, nick, command):
+        await super().handle_command(nick, command)
         nick = nick.lower()
         if (nick == 'mountainriderak') or (nick == 'mountainriderbot'):
             await self.handle_speech_command(command)
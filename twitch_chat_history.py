@@ -0,0 +1,126 @@
+"""
+    twitch_chat_history.py: A fixed size buffer of recent Twitch chat messages
+    Copyright (C) 2020  MountainRiderAK
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as
+    published by the Free Software Foundation, version 3 of the
+    License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import deque
+import time
+
+token_strip_characters = '.,!?;:"\'()[]{}<>'
+
+
+def tokenize(message):
+    result = set()
+    for word in message.lower().split():
+        token = word.strip(token_strip_characters)
+        if token:
+            result.add(token)
+    return result
+
+
+def add_to_index(index, key, sequence):
+    entries = index.get(key)
+    if entries is None:
+        entries = deque()
+        index[key] = entries
+    entries.append(sequence)
+
+
+def remove_from_index(index, key, sequence):
+    # Entries are evicted oldest first, so the evicted sequence number is
+    # always at the left end of every deque that contains it
+    entries = index[key]
+    if entries[0] != sequence:
+        raise RuntimeError(f"Index for {key!r} starts at {entries[0]}, expected {sequence}")
+    entries.popleft()
+    if not entries:
+        del index[key]
+
+
+def add_nick_to_token(index, token, nick):
+    # Each token maps to a dict of nick -> count, ordered by the most recent
+    # use of the token by each nick
+    nick_counts = index.get(token)
+    if nick_counts is None:
+        nick_counts = dict()
+        index[token] = nick_counts
+    nick_counts[nick] = nick_counts.pop(nick, 0) + 1
+
+
+def remove_nick_from_token(index, token, nick):
+    nick_counts = index[token]
+    if nick_counts.get(nick, 0) < 1:
+        raise RuntimeError(f"Index for {token!r} has no messages from {nick!r}")
+    nick_counts[nick] -= 1
+    if nick_counts[nick] == 0:
+        del nick_counts[nick]
+    if not nick_counts:
+        del index[token]
+
+
+class TwitchChatHistory(object):
+    def __init__(self, capacity):
+        if not isinstance(capacity, int) or capacity < 1:
+            raise ValueError(f"Chat history capacity must be a positive integer, not {capacity!r}")
+        self.capacity = capacity
+        self.entries = [None] * capacity
+        self.sequence = 0
+        self.nick_index = dict()
+        self.token_index = dict()
+
+    def __len__(self):
+        return min(self.sequence, self.capacity)
+
+    def add(self, nick, message, timestamp=None):
+        nick = nick.lower()
+        if timestamp is None:
+            timestamp = time.time()
+        slot = self.sequence % self.capacity
+        if self.entries[slot] is not None:
+            self.evict(self.sequence - self.capacity, self.entries[slot])
+        tokens = tokenize(message)
+        self.entries[slot] = (nick, message, tokens, timestamp)
+        add_to_index(self.nick_index, nick, self.sequence)
+        for token in tokens:
+            add_nick_to_token(self.token_index, token, nick)
+        self.sequence += 1
+
+    def evict(self, sequence, entry):
+        nick, message, tokens, timestamp = entry
+        remove_from_index(self.nick_index, nick, sequence)
+        for token in tokens:
+            remove_nick_from_token(self.token_index, token, nick)
+
+    def message_count(self, nick):
+        return len(self.nick_index.get(nick.lower(), ()))
+
+    def messages_from(self, nick, limit):
+        result = list()
+        for sequence in reversed(self.nick_index.get(nick.lower(), ())):
+            if len(result) >= limit:
+                break
+            nick, message, tokens, timestamp = self.entries[sequence % self.capacity]
+            result.append((timestamp, message))
+        return result
+
+    def nicks_who_said(self, token, limit):
+        result = list()
+        token = token.lower().strip(token_strip_characters)
+        for nick in reversed(self.token_index.get(token, {})):
+            if len(result) >= limit:
+                break
+            result.append(nick)
+        return result
@@ -0,0 +1,163 @@
+"""
+    twitch_chat_transport.py: Connections used to talk to Twitch chat
+    Copyright (C) 2020  MountainRiderAK
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as
+    published by the Free Software Foundation, version 3 of the
+    License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from abc import ABC
+from abc import abstractmethod
+import asyncio
+import ssl
+
+import websockets
+
+
+def split_lines(text):
+    return [line.rstrip() for line in text.split('\n') if line.strip()]
+
+
+class TwitchChatTransport(ABC):
+    """
+    Base class for a connection that sends and receives IRC lines
+    """
+
+    @abstractmethod
+    async def connect(self):
+        pass
+
+    @abstractmethod
+    async def send_lines(self, lines):
+        pass
+
+    @abstractmethod
+    async def recv_lines(self):
+        """
+        Wait for data and return the list of complete lines received.
+        Raises ConnectionError if the connection was closed.
+        """
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+
+class WebsocketTransport(TwitchChatTransport):
+    twitch_chat_websocket_uri = "wss://irc-ws.chat.twitch.tv:443"
+
+    def __init__(self, uri=None):
+        self.uri = uri if uri is not None else self.twitch_chat_websocket_uri
+        self.websocket = None
+        self.receive_buffer = ''
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.uri)
+        self.receive_buffer = ''
+
+    async def send_lines(self, lines):
+        if self.websocket is None:
+            raise ConnectionResetError("Not connected")
+        try:
+            for line in lines:
+                await self.websocket.send(f"{line}\r\n")
+        except websockets.ConnectionClosed as error:
+            raise ConnectionResetError(str(error)) from error
+
+    async def recv_lines(self):
+        if self.websocket is None:
+            raise ConnectionResetError("Not connected")
+        try:
+            self.receive_buffer = self.receive_buffer + await self.websocket.recv()
+        except websockets.ConnectionClosed as error:
+            raise ConnectionResetError(str(error)) from error
+        end = self.receive_buffer.rfind('\n') + 1
+        lines = split_lines(self.receive_buffer[:end])
+        self.receive_buffer = self.receive_buffer[end:]
+        return lines
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+            self.websocket = None
+
+
+class TcpTransport(TwitchChatTransport):
+    twitch_chat_host = "irc.chat.twitch.tv"
+    twitch_chat_port = 6697
+    read_size = 64 * 1024
+
+    def __init__(self, host=None, port=None, use_tls=True):
+        self.host = host if host is not None else self.twitch_chat_host
+        self.port = port if port is not None else self.twitch_chat_port
+        self.use_tls = use_tls
+        self.reader = None
+        self.writer = None
+        # Only holds a partial line left over from earlier reads. Each stream
+        # read still allocates a new bytes object.
+        self.receive_buffer = bytearray()
+
+    async def connect(self):
+        ssl_context = ssl.create_default_context() if self.use_tls else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=ssl_context)
+        del self.receive_buffer[:]
+
+    async def send_lines(self, lines):
+        if self.writer is None:
+            raise ConnectionResetError("Not connected")
+        # Coalesce all lines into a single write
+        self.writer.write(''.join(f"{line}\r\n" for line in lines).encode('utf-8'))
+        await self.writer.drain()
+
+    async def recv_lines(self):
+        if self.reader is None:
+            raise ConnectionResetError("Not connected")
+        while True:
+            data = await self.reader.read(self.read_size)
+            if not data:
+                raise ConnectionResetError("Connection closed by server")
+            if not self.receive_buffer and data.endswith(b'\n'):
+                # Most reads end on a line boundary, decode those without copying them into receive_buffer
+                return split_lines(data.decode('utf-8', errors='replace'))
+            self.receive_buffer.extend(data)
+            end = self.receive_buffer.rfind(b'\n') + 1
+            if end:
+                break
+        with memoryview(self.receive_buffer) as view:
+            text = str(view[:end], 'utf-8', 'replace')
+        del self.receive_buffer[:end]
+        return split_lines(text)
+
+    async def close(self):
+        if self.writer is not None:
+            writer = self.writer
+            self.reader = None
+            self.writer = None
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                # The server may already have dropped the connection
+                pass
+
+
+transport_classes = {
+    'websocket': WebsocketTransport,
+    'tcp': TcpTransport,
+}
+
+
+def create_transport(name):
+    if not isinstance(name, str) or name.lower() not in transport_classes:
+        raise ValueError(f"TRANSPORT must be one of {sorted(transport_classes)}, not {name!r}")
+    return transport_classes[name.lower()]()
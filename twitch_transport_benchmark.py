@@ -0,0 +1,144 @@
+"""
+    twitch_transport_benchmark.py: Compare the chat transports on a local server
+    Copyright (C) 2020  MountainRiderAK
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as
+    published by the Free Software Foundation, version 3 of the
+    License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import sys
+import time
+
+import websockets
+
+from twitch_chat_transport import TcpTransport
+from twitch_chat_transport import WebsocketTransport
+from twitch_privmsg import TwitchPrivmsg
+import microsecond_logging
+
+host = '127.0.0.1'
+tcp_port = 49201
+websocket_port = 49202
+line_count = 200000
+batch_size = 100
+
+
+def make_privmsg(index):
+    return f":viewer{index % 1000}!viewer{index % 1000}@viewer{index % 1000}.tmi.twitch.tv " \
+           f"PRIVMSG #channel :benchmark message number {index}"
+
+
+def make_batches():
+    lines = [make_privmsg(index) for index in range(line_count)]
+    return [lines[start:start + batch_size] for start in range(0, line_count, batch_size)]
+
+
+async def tcp_handler(reader, writer):
+    if await reader.readline() == b'SEND\r\n':
+        for batch in make_batches():
+            writer.write(''.join(f"{line}\r\n" for line in batch).encode('utf-8'))
+            await writer.drain()
+    else:
+        received = 0
+        while received < line_count:
+            data = await reader.read(64 * 1024)
+            if not data:
+                break
+            received += data.count(b'\n')
+        writer.write(b'DONE\r\n')
+        await writer.drain()
+    writer.close()
+
+
+async def websocket_handler(websocket, path=None):
+    request = await websocket.recv()
+    if request == 'SEND\r\n':
+        # Same batches as tcp_handler, one frame per batch to match one write
+        for batch in make_batches():
+            await websocket.send(''.join(f"{line}\r\n" for line in batch))
+    elif request == 'SEND LINES\r\n':
+        # One frame per line
+        for batch in make_batches():
+            for line in batch:
+                await websocket.send(f"{line}\r\n")
+    else:
+        received = 0
+        while received < line_count:
+            received += (await websocket.recv()).count('\n')
+        await websocket.send('DONE\r\n')
+    await websocket.close()
+
+
+async def receive_lines(transport, request='SEND'):
+    await transport.connect()
+    await transport.send_lines([request])
+    start = time.perf_counter()
+    received = 0
+    while received < line_count:
+        for line in await transport.recv_lines():
+            TwitchPrivmsg(line)
+            received += 1
+    elapsed = time.perf_counter() - start
+    await transport.close()
+    return elapsed
+
+
+async def send_lines(transport):
+    await transport.connect()
+    await transport.send_lines(['RECEIVE'])
+    start = time.perf_counter()
+    for batch in make_batches():
+        await transport.send_lines(batch)
+    while 'DONE' not in await transport.recv_lines():
+        pass
+    elapsed = time.perf_counter() - start
+    await transport.close()
+    return elapsed
+
+
+async def run_benchmark(logger):
+    tcp_server = await asyncio.start_server(tcp_handler, host, tcp_port)
+    websocket_server = await websockets.serve(websocket_handler, host, websocket_port)
+    transport_dict = {
+        'websocket': lambda: WebsocketTransport(f"ws://{host}:{websocket_port}"),
+        'tcp': lambda: TcpTransport(host, tcp_port, use_tls=False),
+    }
+    for name, create in transport_dict.items():
+        elapsed = await receive_lines(create())
+        logger.info(f"{name:9}: received {line_count} lines, {batch_size} per write, "
+                    f"in {elapsed:.3f} s ({line_count / elapsed:.0f} lines/s)")
+        if name == 'websocket':
+            elapsed = await receive_lines(create(), 'SEND LINES')
+            logger.info(f"{name:9}: received {line_count} lines, 1 per frame, "
+                        f"in {elapsed:.3f} s ({line_count / elapsed:.0f} lines/s)")
+        elapsed = await send_lines(create())
+        logger.info(f"{name:9}: sent {line_count} lines, {batch_size} per send_lines, "
+                    f"in {elapsed:.3f} s ({line_count / elapsed:.0f} lines/s)")
+    websocket_server.close()
+    await websocket_server.wait_closed()
+    tcp_server.close()
+    await tcp_server.wait_closed()
+
+
+def main():
+    global line_count
+    if len(sys.argv) > 1:
+        line_count = int(sys.argv[1])
+    logger = microsecond_logging.getLogger(__name__, bare=True)
+    logger.setLevel(microsecond_logging.INFO)
+    asyncio.run(run_benchmark(logger))
+
+
+if __name__ == '__main__':
+    main()